@@ -1,126 +1,694 @@
 import streamlit as st
-import subprocess
+import av
+import contextlib
+import errno
+import io
+import itertools
 import os
+import pycurl
+import queue
+import re
 import shlex
+import threading
+import uuid
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+from response_errors import NotAudioError, SegmentJoinError
 
-# --- Page Configuration ---
-# Set the title and a favicon for the browser tab.
-st.set_page_config(page_title="GPT tex to speech audio Downloader", page_icon="⬇️")
-
-# --- Application UI ---
-st.title("GPT text to speech Downloader")
-st.markdown("""
-This application provides a user-friendly interface to execute a `cURL` command and download the resulting output file.
-
-**How to use:**
-1.  Paste your full `cURL` command into the text area below. The app will automatically handle commands copied from the Windows Command Prompt (by removing `^` characters).
-2.  Enter a desired name for the output file (the `.aac` extension will be added automatically).
-3.  Click the "Generate and Download File" button.
-
-The app will then execute the command and, if successful, provide a button to download your file.
-""")
-
-# --- Security Warning ---
-# It's crucial to warn users about the potential security risks of executing arbitrary commands.
-st.warning(
-    "⚠️ **Security Warning:** This application executes shell commands based on your input. "
-    "Only run `cURL` commands from trusted sources. Malicious commands could potentially "
-    "harm your system or expose sensitive data."
-)
-
-# --- User Input Fields ---
-# A larger text area is suitable for potentially long cURL commands.
-curl_command_input = st.text_area(
-    "Enter your cURL command here:",
-    height=150,
-    placeholder="curl -X POST https://api.example.com/text-to-speech ..."
-)
-
-# A standard text input for the filename.
-file_name_input = st.text_input(
-    "Enter the desired output filename (without extension):",
-    placeholder="my_audio_file"
-)
-
-# --- Execution Logic ---
-# This button triggers the main functionality of the app.
-if st.button("Generate and Download File"):
-    # --- Input Validation ---
-    if not curl_command_input:
-        st.error("Please enter a cURL command to execute.")
-    elif not file_name_input:
-        st.error("Please provide a filename for the output.")
-    else:
-        # --- Command Construction and Execution ---
+# --- cURL Translation ---
+# Options that consume the following argument, grouped by how they are applied to the pycurl handle.
+METHOD_OPTIONS = {"-X", "--request"}
+HEADER_OPTIONS = {"-H", "--header"}
+DATA_OPTIONS = {"-d", "--data", "--data-raw", "--data-binary", "--data-ascii"}
+VALUE_OPTIONS = {
+    "--url": pycurl.URL,
+    "-A": pycurl.USERAGENT,
+    "--user-agent": pycurl.USERAGENT,
+    "-b": pycurl.COOKIE,
+    "--cookie": pycurl.COOKIE,
+    "-e": pycurl.REFERER,
+    "--referer": pycurl.REFERER,
+    "-u": pycurl.USERPWD,
+    "--user": pycurl.USERPWD,
+}
+# Sends its value like --data-binary, along with JSON Content-Type and Accept headers.
+JSON_OPTIONS = {"--json"}
+JSON_HEADERS = [b"Content-Type: application/json", b"Accept: application/json"]
+# The response is always kept in memory, so any output target in the pasted command is ignored.
+OUTPUT_OPTIONS = {"-o", "--output"}
+OPTIONS_WITH_VALUE = (
+    METHOD_OPTIONS | HEADER_OPTIONS | DATA_OPTIONS | JSON_OPTIONS | OUTPUT_OPTIONS
+) | VALUE_OPTIONS.keys()
+
+# Flags without a value that "Copy as cURL" commonly adds.
+FLAG_OPTIONS = {
+    "--compressed": [(pycurl.ACCEPT_ENCODING, "")],
+    "-L": [(pycurl.FOLLOWLOCATION, True)],
+    "--location": [(pycurl.FOLLOWLOCATION, True)],
+    "-k": [(pycurl.SSL_VERIFYPEER, False), (pycurl.SSL_VERIFYHOST, 0)],
+    "--insecure": [(pycurl.SSL_VERIFYPEER, False), (pycurl.SSL_VERIFYHOST, 0)],
+}
+# --fail is ignored because every request already fails on an HTTP error status (see build_curl).
+IGNORED_FLAGS = {
+    "-s", "--silent", "-S", "--show-error", "-v", "--verbose", "-i", "--include", "-f", "--fail",
+}
+
+# Applied to every handle before the pasted options, which can still override them:
+# --compressed, --tcp-fastopen and --tcp-nodelay, plus HTTP/2 over TLS where libcurl supports it.
+PERFORMANCE_OPTIONS = [
+    (pycurl.ACCEPT_ENCODING, ""),
+    (pycurl.TCP_NODELAY, True),
+]
+# TCP Fast Open depends on the platform as well as the libcurl build (see build_curl).
+if hasattr(pycurl, "TCP_FASTOPEN"):
+    PERFORMANCE_OPTIONS.append((pycurl.TCP_FASTOPEN, True))
+if pycurl.version_info()[4] & pycurl.VERSION_HTTP2:
+    PERFORMANCE_OPTIONS.append((pycurl.HTTP_VERSION, pycurl.CURL_HTTP_VERSION_2TLS))
+# Data shared by all handles of the process, so repeated requests to the same API reuse DNS
+# lookups and TLS sessions. libcurl does not support sharing the connection cache between
+# threads, so open connections are reused per worker thread instead (see worker_multi()).
+SHARED_DATA = (pycurl.LOCK_DATA_DNS, pycurl.LOCK_DATA_SSL_SESSION)
+
+# libcurl's receive buffer, which is also the largest chunk handed to the write callback. 1 MiB
+# instead of the 16 KiB default means far fewer Python callbacks on fast transfers.
+RECEIVE_BUFFER_SIZE = 1 << 20
+
+
+def _option_value(arguments, option):
+    """Return the value that follows `option`, failing loudly if the command ends early."""
+    try:
+        return next(arguments)
+    except StopIteration:
+        raise ValueError(f"The `{option}` option is missing its value.") from None
+
+
+def _split_short_options(arguments):
+    """
+    Expand short options the way curl parses them: bundled flags (`-sSL`) become single flags, and
+    a short option that takes a value may have it attached (`-XPOST`, `-HAccept: audio/mpeg`).
+    """
+    arguments = iter(arguments)
+    for argument in arguments:
+        options, value = [argument], None
+        if argument.startswith("-") and not argument.startswith("--") and len(argument) > 2:
+            options = []
+            for position in range(1, len(argument)):
+                options.append("-" + argument[position])
+                if options[-1] in OPTIONS_WITH_VALUE:
+                    value = argument[position + 1:] or None
+                    break
+        yield from options
+        if value is None and options[-1] in OPTIONS_WITH_VALUE:
+            # A separate value is passed through untouched, even when it starts with "-".
+            value = next(arguments, None)
+        if value is not None:
+            yield value
+
+
+def build_curl(command_list):
+    """Translate a parsed cURL command line into a configured pycurl handle."""
+    if not command_list or command_list[0] != "curl":
+        raise ValueError("The command must start with `curl`.")
+
+    curl = pycurl.Curl()
+    curl.setopt(pycurl.SHARE, _resources().curl_share)
+    for option, value in PERFORMANCE_OPTIONS:
         try:
-            # Use os.path.basename to prevent directory traversal attacks (e.g., ../../etc/passwd)
-            safe_filename = os.path.basename(file_name_input)
-            output_filename = f"{safe_filename}.aac"
-
-            # Clean the input command by removing Windows CMD escape characters (^).
-            cleaned_command = curl_command_input.replace('^', '')
-
-            # Use shlex.split to safely parse the cleaned command-line string into a list of arguments.
-            # This is a security best practice over using shell=True.
-            command_list = shlex.split(cleaned_command)
-            command_list.extend(["--output", output_filename])
-
-            st.info(f"Executing cleaned command: `{' '.join(command_list)}`")
-
-            # Show a spinner to indicate that the process is running in the background.
-            with st.spinner(f"Executing command and generating '{output_filename}'..."):
-                # Execute the command using subprocess.run.
-                # We set check=False to manually handle errors and inspect the output.
-                process = subprocess.run(
-                    command_list,
-                    capture_output=True,
-                    text=True,
-                    check=False
-                )
+            curl.setopt(option, value)
+        except pycurl.error:
+            # These are optimizations only, so a libcurl build that lacks one still sends the request.
+            pass
 
-            # --- Process Results ---
-            # A return code of 0 typically indicates success.
-            if process.returncode == 0:
-                # After the command runs, verify that the output file was actually created.
-                if os.path.exists(output_filename):
-                    st.success(f"File '{output_filename}' generated successfully!")
-
-                    # Read the generated file in binary mode for the download button.
-                    with open(output_filename, "rb") as file:
-                        st.download_button(
-                            label=f"Download {output_filename}",
-                            data=file,
-                            file_name=output_filename,
-                            mime="audio/aac"  # Set the appropriate MIME type for the file.
-                        )
-                else:
-                    # Handle cases where the command runs but doesn't produce the expected file.
-                    st.warning("Command executed, but the output file was not found.")
-                    st.info("Review the command's output below for details:")
-                    st.code(process.stdout or "No standard output.", language="text")
-                    st.code(process.stderr or "No standard error output.", language="bash")
+    headers, data, json_data, url = [], [], [], None
+    arguments = _split_short_options(command_list[1:])
+    for argument in arguments:
+        if argument in METHOD_OPTIONS:
+            curl.setopt(pycurl.CUSTOMREQUEST, _option_value(arguments, argument))
+        elif argument in HEADER_OPTIONS:
+            headers.append(_option_value(arguments, argument).encode("utf-8"))
+        elif argument in DATA_OPTIONS or argument in JSON_OPTIONS:
+            value = _option_value(arguments, argument)
+            if value.startswith("@"):
+                raise ValueError("Reading request data from a file (`@filename`) is not supported.")
+            (json_data if argument in JSON_OPTIONS else data).append(value)
+        elif argument in VALUE_OPTIONS:
+            value = _option_value(arguments, argument)
+            if VALUE_OPTIONS[argument] == pycurl.URL:
+                url = value
             else:
-                # If the command fails, show the error message from stderr.
-                st.error(f"Command failed with exit code {process.returncode}.")
-
-                # Provide specific help for common curl errors, like code 3 (CURLE_URL_MALFORMAT).
-                if process.returncode == 3:
-                    st.warning(
-                        "**Hint: The URL in your command appears to be malformed.**\n\n"
-                        "This error often means the URL was not entered correctly. "
-                        "Please carefully check the URL in your command for common issues like:\n"
-                        "* Typos or extra spaces within the URL.\n"
-                        "* An invalid port number (e.g., `hostname:port`).\n"
-                        "* Missing or incorrect protocol (e.g., `http://` or `https://`)."
-                    )
-                
-                # Display the actual error output from the command.
-                st.code(f"Terminal Output (stderr):\n{process.stderr}", language="bash")
-
-        except FileNotFoundError:
-            st.error(
-                "Error: `curl` command not found. "
-                "Please ensure cURL is installed on the system and accessible in the system's PATH."
+                curl.setopt(VALUE_OPTIONS[argument], value.encode("utf-8"))
+        elif argument in OUTPUT_OPTIONS:
+            _option_value(arguments, argument)
+        elif argument in FLAG_OPTIONS:
+            for option, value in FLAG_OPTIONS[argument]:
+                curl.setopt(option, value)
+        elif argument in IGNORED_FLAGS:
+            continue
+        elif argument.startswith("-"):
+            raise ValueError(f"The cURL option `{argument}` is not supported.")
+        else:
+            url = argument
+
+    if url is None:
+        raise ValueError("No URL was found in the cURL command.")
+    if json_data and data:
+        raise ValueError("`--json` cannot be combined with other data options.")
+    if json_data:
+        # Unlike -d, repeated --json values are concatenated without a separator.
+        data = ["".join(json_data)]
+        # Like curl --json, headers set explicitly in the command take precedence.
+        names = {header.split(b":", 1)[0].strip().lower() for header in headers}
+        for header in JSON_HEADERS:
+            if header.split(b":", 1)[0].lower() not in names:
+                headers.append(header)
+
+    curl.setopt(pycurl.URL, url)
+    curl.setopt(pycurl.HTTPHEADER, headers)
+    # Like `curl --fail`: an error status aborts the transfer, as its body is not audio.
+    curl.setopt(pycurl.FAILONERROR, True)
+    curl.setopt(pycurl.BUFFERSIZE, RECEIVE_BUFFER_SIZE)
+    if data:
+        # Multiple -d options are joined with '&', exactly like the curl command-line tool does.
+        curl.setopt(pycurl.POSTFIELDS, "&".join(data).encode("utf-8"))
+    return curl
+
+
+def split_commands(command):
+    """Split pasted input into separate cURL commands, each starting on a line that begins with `curl`."""
+    commands = []
+    for line in command.splitlines():
+        if line.lstrip().startswith("curl") or not commands:
+            commands.append(line)
+        else:
+            commands[-1] += "\n" + line
+    return commands
+
+
+# Streamlit re-executes this script on every rerun, which would reset a functools.lru_cache, so
+# the parse cache lives in Streamlit's cache instead.
+@st.cache_data(show_spinner=False, max_entries=128)
+def parse_curl(command):
+    """
+    Parse pasted input into a tuple of cURL commands, each a tuple of arguments.
+
+    The normalized tuples make a deterministic cache key: inputs that only differ in quoting,
+    whitespace or line continuations parse to the same value.
+    """
+    # Windows CMD escapes characters with ^, but in Unix-style input (continued with a trailing
+    # backslash) a ^ is a literal character that may be part of the payload. Like the shell, the
+    # backslash and newline are then removed, so they cannot end up inside an argument.
+    unix_continuation = _resources().unix_continuation
+    if unix_continuation.search(command):
+        command = unix_continuation.sub(" ", command)
+    else:
+        command = command.replace("^", "")
+
+    # Use shlex.split to safely parse each command-line string into a list of arguments.
+    return tuple(tuple(shlex.split(line)) for line in split_commands(command))
+
+
+# --- Parallel Downloads ---
+# Upper bound on simultaneous connections when several segments are requested at once.
+PARALLEL_MAX = 16
+# Leading bytes that identify a response as audio before it is handed to libav: WAV, Ogg, FLAC and
+# MP4 ("ftyp" at offset 4) containers, or a bare MP3 or ADTS stream (see is_frame_stream()).
+SNIFF_SIZE = 12
+CONTAINER_SIGNATURES = (b"RIFF", b"OggS", b"fLaC")
+
+
+def is_frame_stream(head):
+    """
+    Check whether audio starting with `head` is a bare MP3 or ADTS (AAC) frame stream.
+
+    Unlike container files, such streams stay valid when several of them are concatenated.
+    """
+    # MPEG audio (MP3) and ADTS (AAC) frames both start with an 11-bit sync word; MP3 files may
+    # also start with an ID3 tag.
+    return head.startswith(b"ID3") or len(head) >= 2 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0
+
+
+def looks_like_audio(head):
+    """Cheap check of the first SNIFF_SIZE bytes for a known audio container or frame header."""
+    return head.startswith(CONTAINER_SIGNATURES) or head[4:8] == b"ftyp" or is_frame_stream(head)
+
+
+class SegmentWriter:
+    """
+    Collect the responses of transfers that run in parallel, in one buffer per segment.
+
+    Segments are kept apart because container files such as WAV cannot be joined by concatenation.
+    The start of every segment is sniffed as it arrives, and the first one that is not audio (such
+    as a JSON error body) is kept in `error`.
+    """
+
+    def __init__(self, count):
+        self.buffers = [bytearray() for _ in range(count)]
+        self.error = None
+
+    def writer(self, index):
+        """Return the pycurl write callback for segment `index`."""
+        def write_segment(chunk):
+            buffer = self.buffers[index]
+            sniffed = len(buffer) >= SNIFF_SIZE
+            buffer += chunk
+            if not sniffed and len(buffer) >= SNIFF_SIZE and not looks_like_audio(buffer[:SNIFF_SIZE]):
+                self._reject(index)
+                # Returning a short count makes libcurl abort the transfer with a write error.
+                return 0
+        return write_segment
+
+    def complete(self, index):
+        """Mark segment `index` as finished."""
+        # Bodies shorter than SNIFF_SIZE can only be checked once they are complete.
+        if len(self.buffers[index]) < SNIFF_SIZE and not looks_like_audio(self.buffers[index]):
+            self._reject(index)
+
+    def _reject(self, index):
+        if self.error is None:
+            self.error = NotAudioError(index, bytes(self.buffers[index][:SNIFF_SIZE]))
+
+
+def worker_multi():
+    """
+    Return the multi handle of the calling worker thread, creating it on first use.
+
+    The multi handle owns the connection cache, so keeping one per thread for the lifetime of the
+    process lets later jobs on the same thread reuse open connections, without any connection
+    ever being used by two threads.
+    """
+    worker_state = _resources().worker_state
+    if not hasattr(worker_state, "multi"):
+        worker_state.multi = pycurl.CurlMulti()
+        worker_state.multi.setopt(pycurl.M_MAX_TOTAL_CONNECTIONS, PARALLEL_MAX)
+    return worker_state.multi
+
+
+def perform_parallel(curls, segments):
+    """
+    Run all `curls` on the worker thread's multi handle, which shares connections between them.
+
+    Stops at the first transfer error or rejected segment, and returns the transfer error, if any.
+    """
+    multi = worker_multi()
+    for index, curl in enumerate(curls):
+        curl.segment_index = index
+        curl.setopt(pycurl.WRITEFUNCTION, segments.writer(index))
+        multi.add_handle(curl)
+
+    curl_error = None
+    try:
+        active = len(curls)
+        while active and curl_error is None and segments.error is None:
+            ret, active = multi.perform()
+            while ret == pycurl.E_CALL_MULTI_PERFORM:
+                ret, active = multi.perform()
+
+            # Completed transfers are reported in whatever order they finish.
+            queued = 1
+            while queued:
+                queued, succeeded, failed = multi.info_read()
+                for curl in succeeded:
+                    segments.complete(curl.segment_index)
+                for curl, error_code, error_message in failed:
+                    curl_error = curl_error or pycurl.error(error_code, error_message)
+            if active:
+                multi.select(1.0)
+    finally:
+        for curl in curls:
+            multi.remove_handle(curl)
+            curl.close()
+    return curl_error
+
+
+# --- Audio Conversion ---
+# Conversion runs in-process through libav (PyAV), so no ffmpeg process is spawned per request.
+MP3_BITRATE = 192000
+# LAME's algorithm quality, from 0 (slowest) to 9 (fastest). 7 matches `lame -f` and encodes
+# noticeably faster than the default; at this constant bitrate the quality difference is negligible.
+MP3_ENCODER_OPTIONS = {"compression_level": "7"}
+# Output variants offered in the sidebar, mapped to their description.
+OUTPUT_VARIANTS = {
+    "auto": "Keep MP3 and AAC as they are, convert anything else to MP3",
+    "mp3": "Always MP3",
+    "original": "Original AAC download, no conversion",
+}
+# Per variant, codecs that are kept as they are instead of being re-encoded to MP3.
+# AAC is remuxed into an MP4 container ("ipod" is libav's muxer for .m4a) with a stream copy.
+MP3_STREAM_COPY = ("mp3", "audio/mpeg", None)
+STREAM_COPY_FORMATS = {
+    "auto": {"mp3": MP3_STREAM_COPY, "aac": ("m4a", "audio/mp4", "ipod")},
+    "mp3": {"mp3": MP3_STREAM_COPY},
+}
+
+
+def download_audio(curls, progress):
+    """
+    Download the response bodies of `curls` in parallel and return them as a list, in command order.
+
+    Each response is sniffed as it arrives, so one that is not audio (such as a JSON error body)
+    aborts the download with NotAudioError without ever being handed to libav.
+    """
+    segments = SegmentWriter(len(curls))
+    progress.put(f"Downloading {len(curls)} segment(s)...")
+    curl_error = perform_parallel(curls, segments)
+
+    # A rejected segment also shows up as a write error, so it is the more useful one to report.
+    if segments.error is not None:
+        raise segments.error
+    if curl_error is not None:
+        raise curl_error
+    return [bytes(buffer) for buffer in segments.buffers]
+
+
+def join_frame_streams(segments):
+    """Join downloaded segments by concatenation, failing if one of several is a container file."""
+    if len(segments) > 1:
+        for index, segment in enumerate(segments):
+            if not is_frame_stream(segment[:SNIFF_SIZE]):
+                raise SegmentJoinError(index, segment[:SNIFF_SIZE])
+    return b"".join(segments)
+
+
+def transcode(segments, variant, progress):
+    """
+    Convert the downloaded audio `segments` in memory into a single file for the output `variant`.
+
+    Returns (file extension, MIME type, data).
+
+    Every segment is opened on its own. When all of them share codec, sample rate and channels,
+    MP3 is kept as it is and, for the "auto" variant, AAC is remuxed without decoding; anything
+    else is decoded and re-encoded to MP3 at MP3_BITRATE with libmp3lame.
+    """
+    with contextlib.ExitStack() as stack:
+        input_streams = []
+        for index, segment in enumerate(segments):
+            source = stack.enter_context(av.open(io.BytesIO(segment)))
+            if not source.streams.audio:
+                raise av.error.InvalidDataError(
+                    errno.EINVAL, f"Response {index + 1} does not contain an audio stream."
+                )
+            input_streams.append(source.streams.audio[0])
+        codecs = {input_stream.codec_context.codec.canonical_name for input_stream in input_streams}
+        parameters = {(input_stream.rate, input_stream.channels) for input_stream in input_streams}
+
+        codec = min(codecs)
+        if len(codecs) == 1 and len(parameters) == 1 and codec in STREAM_COPY_FORMATS[variant]:
+            extension, mime, container_format = STREAM_COPY_FORMATS[variant][codec]
+            progress.put(f"Detected codec '{codec}', keeping the audio as .{extension} (stream copy).")
+            if container_format is None:
+                if all(is_frame_stream(segment[:SNIFF_SIZE]) for segment in segments):
+                    return extension, mime, b"".join(segments)
+                # MP3 inside another container, such as WAV, is remuxed into a bare MP3 stream.
+                container_format = "mp3"
+
+            output_buffer = io.BytesIO()
+            with av.open(output_buffer, "w", format=container_format) as output:
+                output_stream = output.add_stream_from_template(input_streams[0])
+                # The timestamps of every segment start over, so each one is shifted to follow the last.
+                offset = 0
+                for input_stream in input_streams:
+                    end = offset
+                    for packet in input_stream.container.demux(input_stream):
+                        # The demuxer ends with an empty flush packet, which must not be muxed.
+                        if packet.dts is None:
+                            continue
+                        shift = round(offset / packet.time_base)
+                        packet.dts += shift
+                        if packet.pts is not None:
+                            packet.pts += shift
+                        end = max(end, (packet.dts + packet.duration) * packet.time_base)
+                        packet.stream = output_stream
+                        output.mux(packet)
+                    offset = end
+            return extension, mime, output_buffer.getvalue()
+
+        progress.put(f"Detected codec {', '.join(map(repr, sorted(codecs)))}, re-encoding to .mp3.")
+        # MP3 only supports mono and stereo and planar samples, and all segments share one rate.
+        layout = "mono" if input_streams[0].channels == 1 else "stereo"
+        rate = input_streams[0].rate
+        output_buffer = io.BytesIO()
+        with av.open(output_buffer, "w", format="mp3") as output:
+            output_stream = output.add_stream(
+                "libmp3lame", rate=rate, layout=layout, format="fltp", options=MP3_ENCODER_OPTIONS
             )
-        except Exception as e:
-            st.error(f"An unexpected error occurred: {e}")
+            output_stream.bit_rate = MP3_BITRATE
+            samples = 0
+            for input_stream in input_streams:
+                # Segments may differ in rate and layout, so each one gets its own resampler; the
+                # resampled frames are numbered by sample count, as the segments' timestamps start over.
+                resampler = av.AudioResampler(format="fltp", layout=layout, rate=rate)
+                for frame in itertools.chain(input_stream.container.decode(input_stream), [None]):
+                    for resampled in resampler.resample(frame):
+                        resampled.pts = samples
+                        resampled.time_base = Fraction(1, rate)
+                        samples += resampled.samples
+                        output.mux(output_stream.encode(resampled))
+            # Flush the frames still buffered in the encoder.
+            output.mux(output_stream.encode(None))
+        return "mp3", "audio/mpeg", output_buffer.getvalue()
+
+
+# --- Background Jobs ---
+# Downloads run on a thread pool shared by all sessions, so a long download never blocks the script thread.
+MAX_CONCURRENT_JOBS = 4
+POLL_INTERVAL = 0.5
+
+# Finished files are kept in memory for an hour, so repeated requests skip both the download and
+# the conversion.
+CACHE_TTL = 3600
+CACHE_MAX_ENTRIES = 32
+
+
+Resources = namedtuple("Resources", ["executor", "curl_share", "worker_state", "unix_continuation"])
+
+
+@st.cache_resource
+def _resources():
+    """
+    Initialize process-wide state once per server process.
+
+    Streamlit re-executes this script on every rerun, so anything created at module level would be
+    rebuilt for every interaction of every session.
+    """
+    # Like `ffmpeg -loglevel error`, only errors are logged; PyAV attaches the last one to the
+    # exception it raises, so no log output has to be captured for successful conversions.
+    av.logging.set_level(av.logging.ERROR)
+
+    # pycurl serializes access to the share internally, so worker threads can use it concurrently.
+    curl_share = pycurl.CurlShare()
+    for shared_data in SHARED_DATA:
+        curl_share.setopt(pycurl.SH_SHARE, shared_data)
+
+    return Resources(
+        executor=ThreadPoolExecutor(max_workers=MAX_CONCURRENT_JOBS),
+        curl_share=curl_share,
+        # Per-thread state of the executor's workers, see worker_multi().
+        worker_state=threading.local(),
+        # A backslash at the end of a line, which continues a command in Unix shells.
+        unix_continuation=re.compile(r"\\\r?\n"),
+    )
+
+
+# st.cache_resource hands every caller the same immutable bytes object, where st.cache_data would
+# unpickle a private copy of the whole file for each session.
+@st.cache_resource(show_spinner=False, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def get_audio_bytes(command_lists, safe_filename, variant, _progress):
+    """
+    Download and convert the audio for the parsed `command_lists`.
+
+    Returns (filename, MIME type, data). Results are cached by command, filename and output
+    variant, so identical requests from any session share one copy of the data and are served
+    without touching the network. Failures raise and are therefore never cached. `_progress` is
+    excluded from the cache key.
+    """
+    # Translate each command into an in-process libcurl request instead of spawning curl.
+    curls = [build_curl(command_list) for command_list in command_lists]
+
+    # Both steps work on in-memory buffers, so no intermediate file is ever written.
+    segments = download_audio(curls, _progress)
+    if variant == "original":
+        return f"{safe_filename}.aac", "audio/aac", join_frame_streams(segments)
+    extension, mime, data = transcode(segments, variant, _progress)
+    return f"{safe_filename}.{extension}", mime, data
+
+
+def show_job_result(job, job_id):
+    """Render the outcome of a finished job: a download button, or the error that stopped it."""
+    try:
+        # --- Process Results ---
+        output_filename, mime, data = job.result()
+        st.success(f"File '{output_filename}' generated successfully!")
+        st.download_button(
+            label=f"Download {output_filename}",
+            data=data,
+            file_name=output_filename,
+            mime=mime,  # Set the appropriate MIME type for the file.
+            key=f"download_{job_id}"
+        )
+
+    except NotAudioError as e:
+        st.error("The server did not return audio.")
+        st.warning(
+            "**Hint: The server answered with something else, usually an error message.**\n\n"
+            "Text-to-speech APIs often reply with a JSON error, for example for an exhausted quota "
+            "or an invalid voice, instead of audio. Check the request and try again."
+        )
+        st.code(f"Server response:\n{e}", language="text")
+    except SegmentJoinError as e:
+        st.error("The responses cannot be joined without converting them.")
+        st.warning(
+            "**Hint: Only plain MP3 and AAC responses can be joined as they are.**\n\n"
+            "Choose another output format in the sidebar to convert the responses into a single file."
+        )
+        st.code(str(e), language="text")
+    # libav's InvalidDataError is also a ValueError, so it has to be handled before parse errors.
+    except av.FFmpegError as e:
+        st.error("Audio conversion failed. The response may not contain valid audio.")
+        st.code(f"libav error:\n{e}", language="bash")
+    except ValueError as e:
+        st.error(f"Could not parse the cURL command: {e}")
+    except pycurl.error as e:
+        error_code, error_message = e.args
+        st.error(f"Request failed with cURL error code {error_code}.")
+
+        # Provide specific help for common curl errors, like code 3 (CURLE_URL_MALFORMAT).
+        if error_code == pycurl.E_URL_MALFORMAT:
+            st.warning(
+                "**Hint: The URL in your command appears to be malformed.**\n\n"
+                "This error often means the URL was not entered correctly. "
+                "Please carefully check the URL in your command for common issues like:\n"
+                "* Typos or extra spaces within the URL.\n"
+                "* An invalid port number (e.g., `hostname:port`).\n"
+                "* Missing or incorrect protocol (e.g., `http://` or `https://`)."
+            )
+        elif error_code == pycurl.E_HTTP_RETURNED_ERROR:
+            st.warning(
+                "**Hint: The server rejected the request.**\n\n"
+                "Copied commands often contain credentials or signed URLs that expire. "
+                "Try copying a fresh `cURL` command from your browser."
+            )
+
+        # Display the error message reported by libcurl.
+        st.code(f"cURL error:\n{error_message}", language="bash")
+    except Exception as e:
+        st.error(f"An unexpected error occurred: {e}")
+
+
+def main():
+    """Render the page and handle the current session's job."""
+    # --- Page Configuration ---
+    # Set the title and a favicon for the browser tab.
+    st.set_page_config(page_title="GPT tex to speech audio Downloader", page_icon="⬇️")
+
+    # --- Application UI ---
+    st.title("GPT text to speech Downloader")
+    st.markdown("""
+    This application provides a user-friendly interface to execute a `cURL` command and download the resulting audio file.
+
+    **How to use:**
+    1.  Paste your full `cURL` command into the text area below. The app will automatically handle commands copied from the Windows Command Prompt (by removing `^` characters). Several commands, each starting on a new line with `curl`, are downloaded in parallel and joined in order into a single file.
+    2.  Enter a desired name for the output file (the extension will be added automatically, depending on the output format chosen in the sidebar).
+    3.  Click the "Generate and Download File" button.
+
+    The app will then perform the request, convert the audio if needed and, if successful, provide a button to download your file.
+    """)
+
+    # --- Security Warning ---
+    # It's crucial to warn users about the potential risks of sending arbitrary requests.
+    st.warning(
+        "⚠️ **Security Warning:** This application performs the HTTP request described by your `cURL` command. "
+        "Only run `cURL` commands from trusted sources. Commands may contain credentials or "
+        "send sensitive data to the target server."
+    )
+
+    # --- User Input Fields ---
+    # A larger text area is suitable for potentially long cURL commands.
+    curl_command_input = st.text_area(
+        "Enter your cURL command here:",
+        height=150,
+        placeholder="curl -X POST https://api.example.com/text-to-speech ..."
+    )
+
+    # A standard text input for the filename.
+    file_name_input = st.text_input(
+        "Enter the desired output filename (without extension):",
+        placeholder="my_audio_file"
+    )
+
+    # The output variant decides whether, and how, the downloaded audio is converted.
+    output_variant = st.sidebar.radio(
+        "Output format",
+        options=list(OUTPUT_VARIANTS),
+        format_func=OUTPUT_VARIANTS.get
+    )
+
+    # --- Execution Logic ---
+    # This button triggers the main functionality of the app.
+    if st.button("Generate and Download File"):
+        # Forget the previous job first, so a submission that fails validation does not show its result.
+        for key in ("job", "job_id", "job_progress", "job_log"):
+            st.session_state.pop(key, None)
+
+        # --- Input Validation ---
+        if not curl_command_input:
+            st.error("Please enter a cURL command to execute.")
+        elif not file_name_input:
+            st.error("Please provide a filename for the output.")
+        else:
+            # --- Command Construction ---
+            try:
+                # Use os.path.basename to prevent directory traversal attacks (e.g., ../../etc/passwd)
+                safe_filename = os.path.basename(file_name_input)
+
+                # Clean and parse the input, handling commands copied from the Windows Command Prompt.
+                command_lists = parse_curl(curl_command_input)
+
+                # Hand the download and conversion to a worker thread; the script run returns immediately
+                # and the job status below is polled until the worker is done.
+                progress = queue.Queue()
+                st.session_state["job_id"] = uuid.uuid4().hex
+                st.session_state["job"] = _resources().executor.submit(
+                    get_audio_bytes, command_lists, safe_filename, output_variant, progress
+                )
+                st.session_state["job_progress"] = progress
+                st.session_state["job_log"] = [
+                    f"Executing cleaned command: {shlex.join(command_list)}" for command_list in command_lists
+                ]
+            except ValueError as e:
+                st.error(f"Could not parse the cURL command: {e}")
+
+    # --- Job Status ---
+    # The job is kept in the session state, so its result survives reruns such as the one
+    # triggered by clicking the download button.
+    if "job" in st.session_state:
+        # While the worker runs, only this fragment is re-executed on a timer. Nothing sleeps on the
+        # script thread and the rest of the page is not rerun while waiting.
+        polling = not st.session_state["job"].done()
+
+        @st.fragment(run_every=POLL_INTERVAL if polling else None)
+        def show_job_status():
+            job = st.session_state["job"]
+            job_log = st.session_state["job_log"]
+
+            # Collect the status lines the worker has reported since the last run.
+            try:
+                while True:
+                    job_log.append(st.session_state["job_progress"].get_nowait())
+            except queue.Empty:
+                pass
+            st.code("\n".join(job_log), language="text")
+
+            if not job.done():
+                st.info("Downloading and converting...")
+            elif polling:
+                # One full rerun redefines this fragment without a timer, which stops the polling.
+                st.rerun()
+            else:
+                show_job_result(job, st.session_state["job_id"])
+
+        show_job_status()
+
+
+if __name__ == "__main__":
+    main()
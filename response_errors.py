@@ -0,0 +1,27 @@
+"""
+Exceptions raised by the background download jobs.
+
+They live outside the app script because Streamlit re-executes that script on every rerun: a
+class defined there is a new class on each run, so an exception raised by a job submitted in an
+earlier run would no longer match the `except` clause that renders its result.
+"""
+
+
+class NotAudioError(Exception):
+    """Raised when a response body does not start like any supported audio format."""
+
+    def __init__(self, segment, head):
+        super().__init__(f"Response {segment + 1} does not look like audio, it starts with {head!r}.")
+        self.segment = segment
+        self.head = head
+
+
+class SegmentJoinError(Exception):
+    """Raised when responses must be joined as they are, but one of them is a container file."""
+
+    def __init__(self, segment, head):
+        super().__init__(
+            f"Response {segment + 1} is not a plain MP3 or AAC stream, it starts with {head!r}."
+        )
+        self.segment = segment
+        self.head = head
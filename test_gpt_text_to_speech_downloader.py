@@ -0,0 +1,213 @@
+"""
+Tests for the command-line translation and segment handling of the downloader.
+
+None of them touch the network or need a running Streamlit server; `_resources()` is replaced by
+a minimal stand-in. Run with `python -m unittest` from the repository root.
+"""
+import io
+import queue
+import re
+import threading
+import unittest
+import wave
+from unittest import mock
+
+import av
+import pycurl
+
+import gpt_text_to_speech_downloader as downloader
+from response_errors import NotAudioError, SegmentJoinError
+
+# An ADTS frame header, a WAV header and a typical JSON error body.
+ADTS_HEAD = b"\xff\xf1\x50\x80\x02\x1f\xfc" + b"\x00" * 5
+WAV_HEAD = b"RIFF\x24\x00\x00\x00WAVE"
+JSON_ERROR = b'{"error": "quota exceeded"}'
+
+
+def setUpModule():
+    resources = downloader.Resources(
+        executor=None,
+        curl_share=pycurl.CurlShare(),
+        worker_state=threading.local(),
+        unix_continuation=re.compile(r"\\\r?\n"),
+    )
+    patcher = mock.patch.object(downloader, "_resources", return_value=resources)
+    patcher.start()
+    unittest.addModuleCleanup(patcher.stop)
+
+
+def make_wav(seconds, rate=8000):
+    """Return a silent mono 16-bit WAV file of the given length."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(rate)
+        wav.writeframes(b"\x00\x00" * int(seconds * rate))
+    return buffer.getvalue()
+
+
+class SplitShortOptionsTest(unittest.TestCase):
+    def split(self, *arguments):
+        return list(downloader._split_short_options(arguments))
+
+    def test_bundled_flags_are_split(self):
+        self.assertEqual(self.split("-sSL", "url"), ["-s", "-S", "-L", "url"])
+
+    def test_attached_values_are_split_off(self):
+        self.assertEqual(
+            self.split("-XPOST", "-HAccept: audio/mpeg"), ["-X", "POST", "-H", "Accept: audio/mpeg"]
+        )
+
+    def test_value_after_bundled_flags(self):
+        self.assertEqual(self.split("-sX", "POST"), ["-s", "-X", "POST"])
+
+    def test_separate_values_are_passed_through(self):
+        self.assertEqual(self.split("-d", "-sS", "--json", ""), ["-d", "-sS", "--json", ""])
+
+
+class BuildCurlTest(unittest.TestCase):
+    def test_accepts_common_browser_flags(self):
+        command = ["curl", "-sSfL", "-XPOST", "-HAccept: audio/mpeg", "--json", "{}", "https://host/tts"]
+        self.assertIsInstance(downloader.build_curl(command), pycurl.Curl)
+
+    def test_rejects_commands_that_are_not_curl(self):
+        with self.assertRaisesRegex(ValueError, "must start with `curl`"):
+            downloader.build_curl(["wget", "https://host/tts"])
+
+    def test_rejects_unknown_options(self):
+        with self.assertRaisesRegex(ValueError, "`-Z` is not supported"):
+            downloader.build_curl(["curl", "-sZ", "https://host/tts"])
+
+    def test_option_without_value(self):
+        with self.assertRaisesRegex(ValueError, "`-H` option is missing its value"):
+            downloader.build_curl(["curl", "https://host/tts", "-H"])
+
+    def test_empty_value_does_not_consume_the_url(self):
+        downloader.build_curl(["curl", "-d", "", "https://host/tts"])
+
+    def test_requires_url(self):
+        with self.assertRaisesRegex(ValueError, "No URL"):
+            downloader.build_curl(["curl", "-s"])
+
+    def test_rejects_data_from_file(self):
+        with self.assertRaisesRegex(ValueError, "@filename"):
+            downloader.build_curl(["curl", "-d", "@body.json", "https://host/tts"])
+
+    def test_rejects_json_mixed_with_data(self):
+        with self.assertRaisesRegex(ValueError, "--json"):
+            downloader.build_curl(["curl", "--json", "{}", "-d", "a=1", "https://host/tts"])
+
+
+class SplitCommandsTest(unittest.TestCase):
+    def test_each_curl_line_starts_a_command(self):
+        command = "curl https://host/1 \\\n  -H 'Accept: */*'\ncurl https://host/2"
+        self.assertEqual(
+            downloader.split_commands(command),
+            ["curl https://host/1 \\\n  -H 'Accept: */*'", "curl https://host/2"],
+        )
+
+
+class ParseCurlTest(unittest.TestCase):
+    def test_unix_continuation_is_removed(self):
+        command = "curl 'https://host/aac'\\\n  -H 'Accept: audio/aac'"
+        self.assertEqual(
+            downloader.parse_curl(command), (("curl", "https://host/aac", "-H", "Accept: audio/aac"),)
+        )
+
+    def test_empty_arguments_are_kept(self):
+        self.assertEqual(
+            downloader.parse_curl("curl -d '' http://host/aac"), (("curl", "-d", "", "http://host/aac"),)
+        )
+
+    def test_windows_escapes_are_removed(self):
+        self.assertEqual(
+            downloader.parse_curl('curl ^"https://host/tts^" ^\n  -H ^"Accept: */*^"'),
+            (("curl", "https://host/tts", "-H", "Accept: */*"),),
+        )
+
+    def test_caret_is_literal_in_unix_input(self):
+        self.assertEqual(
+            downloader.parse_curl("curl https://host/tts \\\n  -d 'a^b'"),
+            (("curl", "https://host/tts", "-d", "a^b"),),
+        )
+
+    def test_several_commands(self):
+        self.assertEqual(len(downloader.parse_curl("curl https://host/1\ncurl https://host/2")), 2)
+
+
+class LooksLikeAudioTest(unittest.TestCase):
+    def test_audio(self):
+        for head in (ADTS_HEAD, WAV_HEAD, b"ID3\x04", b"OggS", b"fLaC", b"\x00\x00\x00\x20ftypM4A "):
+            self.assertTrue(downloader.looks_like_audio(head), head)
+
+    def test_not_audio(self):
+        for head in (JSON_ERROR[:downloader.SNIFF_SIZE], b"<html>", b""):
+            self.assertFalse(downloader.looks_like_audio(head), head)
+
+    def test_only_bare_streams_are_frame_streams(self):
+        self.assertTrue(downloader.is_frame_stream(ADTS_HEAD))
+        self.assertTrue(downloader.is_frame_stream(b"ID3\x04"))
+        self.assertFalse(downloader.is_frame_stream(WAV_HEAD))
+
+
+class SegmentWriterTest(unittest.TestCase):
+    def test_segments_are_kept_apart(self):
+        segments = downloader.SegmentWriter(2)
+        segments.writer(1)(ADTS_HEAD)
+        segments.writer(0)(WAV_HEAD)
+        segments.writer(0)(b"data")
+        segments.complete(0)
+        segments.complete(1)
+        self.assertIsNone(segments.error)
+        self.assertEqual(segments.buffers, [WAV_HEAD + b"data", ADTS_HEAD])
+
+    def test_non_audio_aborts_the_transfer(self):
+        segments = downloader.SegmentWriter(2)
+        segments.writer(0)(ADTS_HEAD)
+        self.assertEqual(segments.writer(1)(JSON_ERROR), 0)
+        self.assertIsInstance(segments.error, NotAudioError)
+        self.assertEqual(segments.error.segment, 1)
+
+    def test_head_split_across_chunks(self):
+        segments = downloader.SegmentWriter(1)
+        write = segments.writer(0)
+        self.assertIsNone(write(JSON_ERROR[:5]))
+        self.assertEqual(write(JSON_ERROR[5:]), 0)
+        self.assertEqual(segments.error.head, JSON_ERROR[:downloader.SNIFF_SIZE])
+
+    def test_short_body_is_checked_on_completion(self):
+        segments = downloader.SegmentWriter(1)
+        segments.writer(0)(b"{}")
+        segments.complete(0)
+        self.assertEqual(segments.error.head, b"{}")
+
+    def test_first_rejection_is_kept(self):
+        segments = downloader.SegmentWriter(2)
+        segments.complete(1)
+        segments.complete(0)
+        self.assertEqual(segments.error.segment, 1)
+
+
+class JoinSegmentsTest(unittest.TestCase):
+    def test_frame_streams_are_concatenated(self):
+        self.assertEqual(downloader.join_frame_streams([ADTS_HEAD, ADTS_HEAD]), ADTS_HEAD * 2)
+
+    def test_single_container_is_kept(self):
+        self.assertEqual(downloader.join_frame_streams([WAV_HEAD]), WAV_HEAD)
+
+    def test_containers_cannot_be_concatenated(self):
+        with self.assertRaises(SegmentJoinError) as raised:
+            downloader.join_frame_streams([ADTS_HEAD, WAV_HEAD])
+        self.assertEqual(raised.exception.segment, 1)
+
+    def test_transcode_keeps_every_segment(self):
+        segments = [make_wav(1), make_wav(1, rate=16000)]
+        extension, mime, data = downloader.transcode(segments, "auto", queue.Queue())
+        self.assertEqual((extension, mime), ("mp3", "audio/mpeg"))
+        with av.open(io.BytesIO(data)) as output:
+            self.assertAlmostEqual(output.duration / av.time_base, 2.0, delta=0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()